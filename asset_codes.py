@@ -0,0 +1,46 @@
+import re
+import sys
+import unicodedata
+import pandas as pd
+
+INCORRECT_TERMS = {
+    "รหัสทรัพย์สิน", "ไม่มี", "Computer", "Notebook", "ไม่มีรหัสทรัพย์สิน",
+    "แทบเล็ต", "รายละเอียด", "nan", "-", "์Notebook", "ทบ. 5589338", "ทบ. 5589339 (รูปเครื่อง)"
+}
+NON_DIGIT_RE = re.compile(r'\D')
+DIGITS_RE = re.compile(r'\d+')
+ZEROS_RE = re.compile(r'0+')
+ASSET_SPLIT_RE = re.compile(r'[ ,/\\*]+')
+INCORRECT_TERMS_RE = re.compile('|'.join(map(re.escape, sorted(INCORRECT_TERMS))))
+# Every Unicode decimal digit (Thai ๑๒๓ included) mapped to its ASCII digit, as int() reads them
+ASCII_DIGITS = str.maketrans({
+    chr(code): str(unicodedata.decimal(chr(code)))
+    for code in range(sys.maxunicode + 1)
+    if unicodedata.category(chr(code)) == 'Nd'
+})
+# int64 holds every 18-digit number; longer tokens are junk, not asset codes
+MAX_CODE_DIGITS = 18
+
+# Strip everything but digits from each asset code; missing values stay <NA>
+def extract_digits(assets):
+    values = assets.astype('string')
+    # Most codes are already plain digits, so only the rest go through the substitution
+    needs_cleansing = ~values.str.fullmatch(DIGITS_RE, na=False).to_numpy(dtype=bool)
+    cleaned = values.to_numpy(dtype=object, copy=True)
+    cleaned[needs_cleansing] = values[needs_cleansing].str.replace(NON_DIGIT_RE, '', regex=True).to_numpy(dtype=object)
+    return pd.Series(cleaned, index=assets.index, dtype='string')
+
+# Valid asset codes are non-zero runs of digits that mention none of INCORRECT_TERMS.
+# Digits are checked in ASCII form: pyarrow strings match with RE2, whose \d skips Thai ๑๒๓
+def invalid_asset_mask(assets):
+    values = assets.astype('string')
+    digits = values.str.translate(ASCII_DIGITS)
+    is_number = digits.str.fullmatch(DIGITS_RE, na=False) & ~digits.str.fullmatch(ZEROS_RE, na=False)
+    has_term = values.str.contains(INCORRECT_TERMS_RE, na=False)
+    return ~(is_number & ~has_term).astype(bool)
+
+# Clean and convert asset codes to exact Int64 values; codes with no digits or too many come back <NA>
+def cleanse_to_int(assets):
+    digits = extract_digits(assets).str.translate(ASCII_DIGITS)
+    digits = digits.where(digits.str.len().between(1, MAX_CODE_DIGITS))
+    return pd.to_numeric(digits).astype('Int64')
@@ -1,47 +1,67 @@
 import streamlit as st
 import pandas as pd
-import re
+import numpy as np
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from asset_codes import ASSET_SPLIT_RE, cleanse_to_int
 
 st.title("🔍 Asset Code Comparator (Integer-Matched)")
 
-# Clean and convert asset code to integer (removes symbols, leading/trailing junk)
-def cleanse(asset):
-    if pd.isna(asset):
-        return None
-    digits = re.sub(r'\D', '', str(asset))
-    return int(digits) if digits.isdigit() else None
+# Keep only the asset code column, as text: calamine still parses every cell, but less stays in memory and nothing is type-inferred
+ASSET_READ_OPTIONS = dict(
+    usecols=lambda column: column == 'รหัสทรัพย์สิน',
+    dtype={'รหัสทรัพย์สิน': str}
+)
+
+# Read every sheet of the cleaned file once, keyed by the uploaded bytes; sheets parse in parallel
+@st.cache_data(show_spinner=False)
+def read_cleaned_sheets(file_bytes):
+    with pd.ExcelFile(BytesIO(file_bytes), engine='calamine') as workbook:
+        sheet_names = workbook.sheet_names
+
+    def read_sheet(sheet_name):
+        return pd.read_excel(BytesIO(file_bytes), sheet_name=sheet_name, engine='calamine', **ASSET_READ_OPTIONS)
+
+    with ThreadPoolExecutor(max_workers=min(8, len(sheet_names))) as executor:
+        return dict(zip(sheet_names, executor.map(read_sheet, sheet_names)))
+
+@st.cache_data(show_spinner=False)
+def read_original_sheet(file_bytes):
+    return pd.read_excel(BytesIO(file_bytes), engine='calamine', **ASSET_READ_OPTIONS)
 
 # Extract cleaned asset codes from all sheets in cleaned file
-def extract_cleaned_codes_from_all_sheets(cleaned_excel_file, relevant_sheets=None):
-    all_sheets = pd.read_excel(cleaned_excel_file, sheet_name=None)
-    cleaned_codes = set()
+@st.cache_data(show_spinner=False)
+def extract_cleaned_codes_from_all_sheets(cleaned_sheets, relevant_sheets=None):
+    chunks = [np.empty(0, dtype='int64')]
 
-    for sheet_name, df in all_sheets.items():
+    for sheet_name, df in cleaned_sheets.items():
         if relevant_sheets and sheet_name not in relevant_sheets:
             continue
         if 'รหัสทรัพย์สิน' in df.columns:
-            cleaned_vals = df['รหัสทรัพย์สิน'].dropna().apply(cleanse).dropna().tolist()
-            cleaned_codes.update(cleaned_vals)
-
-    return cleaned_codes
-
-# Compare original against cleaned set
-def process_comparison(original_df, cleaned_code_set):
-    results = []
-    for _, row in original_df.iterrows():
-        raw = str(row.get('รหัสทรัพย์สิน', ''))
-        assets = re.split(r'[ ,/\\*]+', raw)
-        for asset in filter(None, map(str.strip, assets)):
-            cleaned = cleanse(asset)
-            status = "Found" if cleaned in cleaned_code_set else "Missing"
-            results.append({
-                "OriginalEntry": raw,
-                "ExtractedAsset": asset,
-                "CleanedAsset (int)": cleaned,
-                "MatchStatus": status
-            })
-    return pd.DataFrame(results)
+            cleaned_vals = cleanse_to_int(df['รหัสทรัพย์สิน'].dropna()).dropna()
+            chunks.append(cleaned_vals.to_numpy(dtype='int64'))
+
+    # Sorted unique int64 array, so matching stays in NumPy
+    return np.unique(np.concatenate(chunks))
+
+# Compare original against cleaned codes
+def process_comparison(original_df, cleaned_codes):
+    if 'รหัสทรัพย์สิน' not in original_df.columns:
+        return pd.DataFrame(columns=["OriginalEntry", "ExtractedAsset", "CleanedAsset (int)", "MatchStatus"])
+
+    raw = original_df['รหัสทรัพย์สิน'].fillna('nan').astype(str)
+    assets = raw.str.split(ASSET_SPLIT_RE).explode().str.strip()
+    assets = assets[assets != '']
+    cleaned = cleanse_to_int(assets)
+    # Cleaned codes are never negative, so -1 stands in for unparseable assets
+    matches = np.isin(cleaned.to_numpy(dtype='int64', na_value=-1), cleaned_codes)
+
+    return pd.DataFrame({
+        "OriginalEntry": raw.loc[assets.index].to_numpy(),
+        "ExtractedAsset": assets.to_numpy(),
+        "CleanedAsset (int)": cleaned.array,
+        "MatchStatus": np.where(matches, "Found", "Missing")
+    })
 
 # --- UI ---
 st.markdown("Upload your files:")
@@ -54,27 +74,28 @@ with col2:
 
 if original_file and cleaned_file:
     try:
-        original_df = pd.read_excel(original_file)
+        original_df = read_original_sheet(original_file.getvalue())
+
+        cleaned_sheets = read_cleaned_sheets(cleaned_file.getvalue())
 
         use_all_sheets = st.checkbox("Use all sheets in cleaned file", value=True)
         if not use_all_sheets:
-            cleaned_preview = pd.read_excel(cleaned_file, sheet_name=None)
-            sheet_list = list(cleaned_preview.keys())
+            sheet_list = list(cleaned_sheets.keys())
             selected_sheets = st.multiselect("Select sheets", sheet_list, default=["Correct Data"])
         else:
             selected_sheets = None
 
         # Extract cleaned asset codes
-        cleaned_code_set = extract_cleaned_codes_from_all_sheets(cleaned_file, relevant_sheets=selected_sheets)
+        cleaned_codes = extract_cleaned_codes_from_all_sheets(cleaned_sheets, relevant_sheets=selected_sheets)
 
         # Compare
-        result_df = process_comparison(original_df, cleaned_code_set)
+        result_df = process_comparison(original_df, cleaned_codes)
 
         st.markdown("### ✅ Comparison Result")
         st.dataframe(result_df, use_container_width=True)
 
         output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
             result_df.to_excel(writer, index=False, sheet_name='Comparison')
         output.seek(0)
 
@@ -1,41 +1,41 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import re
 from io import BytesIO
 import time
+import xlsxwriter
 from openpyxl import load_workbook
+from asset_codes import ASSET_SPLIT_RE, extract_digits, invalid_asset_mask
 
 # Constants
 ASSET_COLUMN = 'รหัสทรัพย์สิน'
 CENTRAL_ASSET_COLUMN = 'หน่วยงานกลางรับทราบและตรวจสอบ'
 FILTER_VALUES = ['อภิสรา สีดาคุณ']
-INCORRECT_TERMS = {
-    "รหัสทรัพย์สิน", "ไม่มี", "Computer", "Notebook", "ไม่มีรหัสทรัพย์สิน",
-    "แทบเล็ต", "รายละเอียด", "nan", "-", "์Notebook", "ทบ. 5589338", "ทบ. 5589339 (รูปเครื่อง)"
-}
+EMAIL_DOMAIN_RE = re.compile(r'@([\w\.-]+)')
 
 # --- Email summary function ---
 def summarize_email_domains(df, column_name='E-mail ผู้สร้างเอกสาร'):
-    def extract_domain(email):
-        if pd.isna(email) or str(email).strip() == "" or str(email).strip().lower() == "nan":
-            return "cpall.co.th"
-        match = re.search(r'@([\w\.-]+)', str(email))
-        return match.group(1).lower() if match else "unknown"
-
     if column_name not in df.columns:
         return pd.DataFrame(columns=["Domain", "Count"])
 
-    domain_counts = df[column_name].apply(extract_domain).value_counts().reset_index()
+    emails = df[column_name].astype('string').str.strip()
+    blank = emails.fillna('').str.lower().isin(['', 'nan'])
+    domains = emails.str.extract(EMAIL_DOMAIN_RE, expand=False).str.lower().fillna('unknown')
+
+    domain_counts = domains.mask(blank, 'cpall.co.th').value_counts().reset_index()
     domain_counts.columns = ["Domain", "Count"]
     return domain_counts
 
 # --- Fallback Excel reader ---
 def safe_read_excel_sheets(path):
     try:
-        return pd.read_excel(path, sheet_name=None)
+        return pd.read_excel(path, sheet_name=None, engine='calamine', dtype={ASSET_COLUMN: str})
     except Exception as e:
         print(f"[WARN] Standard read failed: {e}")
         print("[INFO] Trying to recover using openpyxl read-only mode...")
+        if hasattr(path, "seek"):
+            path.seek(0)
         try:
             wb = load_workbook(filename=path, read_only=True, data_only=True)
             dataframes = {}
@@ -53,67 +53,76 @@ def safe_read_excel_sheets(path):
             raise
 
 # --- Filter helpers ---
-def is_invalid_asset(asset_value):
-    if pd.isna(asset_value) or not isinstance(asset_value, str) or asset_value.strip() == '':
-        return True
-    if asset_value.isdigit() and int(asset_value) == 0:
-        return True
-    if not asset_value.isdigit():
-        return True
-    if any(term in asset_value for term in INCORRECT_TERMS):
-        return True
-    return False
-
-def cleanse_asset_code(asset_value):
-    return re.sub(r'\D', '', asset_value) if isinstance(asset_value, str) else asset_value
-
-def ensure_utf8_encoding(df):
-    return df.apply(lambda x: x.str.encode('utf-8').str.decode('utf-8') if x.dtype == "object" else x)
+# --- Cached read ---
+@st.cache_data(show_spinner=False)
+def read_all_sheets(file_bytes):
+    sheets = safe_read_excel_sheets(BytesIO(file_bytes))
+    # Few distinct reviewers, so compare category codes instead of strings
+    for df in sheets.values():
+        if CENTRAL_ASSET_COLUMN in df.columns:
+            df[CENTRAL_ASSET_COLUMN] = df[CENTRAL_ASSET_COLUMN].astype('category')
+    return sheets
+
+# --- Streaming Excel writer ---
+# Rows go out top to bottom, so constant_memory can flush each one instead of holding whole sheets in RAM
+def write_excel_sheets(sheets):
+    output_buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(output_buffer, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'nan_inf_to_errors': True,
+    })
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+
+    for sheet_name, frame in sheets.items():
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, [str(column) for column in frame.columns], header_format)
+        values = frame.astype(object).where(frame.notna(), None)
+        for row_number, row in enumerate(values.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_number, 0, row)
+
+    workbook.close()
+    output_buffer.seek(0)
+    return output_buffer
 
 # --- Main processing function ---
-def process_excel(df):
-    progress_bar = st.progress(0)
-
-    incorrect_mask = df[ASSET_COLUMN].apply(is_invalid_asset)
-    correct_data = df[~incorrect_mask].copy()
-    incorrect_data = df[incorrect_mask].copy()
-
-    correct_data[ASSET_COLUMN] = correct_data[ASSET_COLUMN].apply(cleanse_asset_code)
-    progress_bar.progress(30)
-
-    split_rows = []
-    for _, row in incorrect_data.iterrows():
-        assets = re.split(r'[ ,/\\*]+', str(row[ASSET_COLUMN]))
-        for asset in filter(None, map(str.strip, assets)):
-            cleaned_asset = cleanse_asset_code(asset)
-            if cleaned_asset:
-                new_row = row.copy()
-                new_row[ASSET_COLUMN] = cleaned_asset
-                split_rows.append(new_row)
-
-    split_result = pd.DataFrame(split_rows)
-    progress_bar.progress(50)
-
-    merged_result = pd.concat([correct_data, split_result], ignore_index=True)
+# Split, cleanse and de-duplicate asset rows; cached so widget reruns skip the transform
+@st.cache_data(show_spinner=False)
+def clean_asset_rows(df):
+    # Fill blanks explicitly: pandas 3 keeps NaN through astype(str), which breaks .str on all-blank columns
+    raw = df[ASSET_COLUMN].fillna('nan').astype(str)
+    tokens = raw.str.split(ASSET_SPLIT_RE).explode().str.strip()
+    tokens = extract_digits(tokens[tokens != ''])
+    tokens = tokens[tokens != '']
+
+    # Rows that already held a clean code go first so drop_duplicates keeps them over split-out tokens
+    already_clean = tokens.to_numpy() == raw.loc[tokens.index].to_numpy()
+    tokens = tokens.iloc[np.argsort(~already_clean, kind='stable')]
+
+    merged_result = df.loc[tokens.index].reset_index(drop=True)
+    merged_result[ASSET_COLUMN] = tokens.to_numpy()
+
+    # === Single validity pass over the cleansed codes ===
+    invalid_mask = invalid_asset_mask(merged_result[ASSET_COLUMN])
+    merged_result = merged_result.loc[~invalid_mask]
 
     # === Remove full-row duplicates AND duplicates based on ASSET_COLUMN ===
     merged_result = merged_result.drop_duplicates(subset=merged_result.columns.tolist(), keep='first')
     merged_result = merged_result.drop_duplicates(subset=[ASSET_COLUMN], keep='first')
 
-    # === Final Clean-Up and Checks ===
-    merged_result[ASSET_COLUMN] = merged_result[ASSET_COLUMN].apply(cleanse_asset_code)
-    merged_result = merged_result[~merged_result[ASSET_COLUMN].apply(is_invalid_asset)]
+    merged_result["Duplicate"] = merged_result.duplicated(subset=[ASSET_COLUMN], keep=False)
+    return merged_result
 
-    merged_result["Duplicate"] = merged_result.duplicated(subset=[ASSET_COLUMN], keep=False).map({True: "Yes", False: "No"})
+def process_excel(df):
+    progress_bar = st.progress(0)
 
-    tara_silom_data = merged_result[merged_result[CENTRAL_ASSET_COLUMN] == 'อภิสรา สีดาคุณ']
-    duplicate_wrong_data = merged_result[
-        (merged_result["Duplicate"] == "Yes") | (merged_result[ASSET_COLUMN].apply(is_invalid_asset))
-    ]
-    correct_all = merged_result.copy()
+    merged_result = clean_asset_rows(df)
+    progress_bar.progress(50)
 
-    for df in [correct_all, tara_silom_data, duplicate_wrong_data]:
-        df[:] = ensure_utf8_encoding(df)
+    tara_silom_data = merged_result[merged_result[CENTRAL_ASSET_COLUMN].isin(FILTER_VALUES)]
+    # Invalid codes were already dropped by invalid_mask in clean_asset_rows, so only duplicates remain to flag
+    duplicate_wrong_data = merged_result[merged_result["Duplicate"]]
+    correct_all = merged_result
 
     progress_bar.progress(80)
 
@@ -121,15 +130,18 @@ def process_excel(df):
     email_summary_tara = summarize_email_domains(tara_silom_data, column_name='E-mail ผู้สร้างเอกสาร')
 
     # === Write all outputs ===
-    output_buffer = BytesIO()
-    with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
-        correct_all.to_excel(writer, sheet_name="Correct Data", index=False)
-        tara_silom_data.to_excel(writer, sheet_name="Tara-Silom", index=False)
-        duplicate_wrong_data.to_excel(writer, sheet_name="Duplicate & Wrong Data", index=False)
-        email_summary_correct.to_excel(writer, sheet_name="Company Email", index=False)
-        email_summary_tara.to_excel(writer, sheet_name="Tara-Silom Email Summary", index=False)
-
-    output_buffer.seek(0)
+    # Duplicate stays boolean for masking and is only spelled out as Yes/No for the written sheets
+    correct_all, tara_silom_data, duplicate_wrong_data = [
+        frame.assign(Duplicate=np.where(frame["Duplicate"], "Yes", "No"))
+        for frame in (correct_all, tara_silom_data, duplicate_wrong_data)
+    ]
+    output_buffer = write_excel_sheets({
+        "Correct Data": correct_all,
+        "Tara-Silom": tara_silom_data,
+        "Duplicate & Wrong Data": duplicate_wrong_data,
+        "Company Email": email_summary_correct,
+        "Tara-Silom Email Summary": email_summary_tara,
+    })
     progress_bar.progress(100)
     time.sleep(0.5)
     progress_bar.empty()
@@ -143,7 +155,7 @@ sheet_names = []
 sheets = {}
 if uploaded_file:
     try:
-        sheets = safe_read_excel_sheets(uploaded_file)
+        sheets = read_all_sheets(uploaded_file.getvalue())
         sheet_names = list(sheets.keys())
     except Exception as e:
         st.error(f"Failed to load Excel file: {e}")
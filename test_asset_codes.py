@@ -0,0 +1,29 @@
+import pandas as pd
+
+from asset_codes import cleanse_to_int, extract_digits, invalid_asset_mask
+
+
+def test_extract_digits_keeps_missing_values():
+    assets = pd.Series(['5589338', 'ทบ. 5589339', None, 'abc'])
+    assert extract_digits(assets).tolist() == ['5589338', '5589339', pd.NA, '']
+
+
+def test_cleanse_to_int_is_exact_and_tolerates_junk():
+    assets = pd.Series([
+        'abc',
+        '12345678901234567',
+        '1-2-3-4-5-6-7-8-9-0-1-2-3-4-5-6-7-8-9-0-1',
+        '5589338\n5589339\n5589340',
+        '๑๒๓',
+        None,
+    ])
+    cleaned = cleanse_to_int(assets)
+    assert str(cleaned.dtype) == 'Int64'
+    assert cleaned.tolist() == [pd.NA, 12345678901234567, pd.NA, pd.NA, 123, pd.NA]
+
+
+def test_invalid_asset_mask_accepts_thai_digits_and_rejects_zeros_and_terms():
+    assets = pd.Series(['๑๒๓', '๕๕๘๙๓๓๘', '123', '0123', '๐๐', '000', 'ไม่มี', 'Notebook', '', None])
+    assert invalid_asset_mask(assets).tolist() == [
+        False, False, False, False, True, True, True, True, True, True,
+    ]